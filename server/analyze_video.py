@@ -0,0 +1,826 @@
+"""Locate the Sora watermark in a video and report when it is visible.
+
+Complements detect_watermark.py: instead of persistence statistics over
+the whole frame, this analyzer probes the four corners (where Sora
+places its mark) with an edge detector, falls back to MSER text
+candidates near the border, and merges the per-frame hits into
+time segments usable by the removal step.
+
+Usage:
+    python analyze_video.py [--pretty] <video_path>
+    python analyze_video.py --server   # read paths from stdin, one
+                                       # JSON report line per path
+
+Prints a JSON report to stdout. --server amortizes interpreter and
+OpenCV start-up across many videos.
+"""
+
+import json
+import os
+import queue
+import sys
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+import numpy as np
+
+# Belt-and-braces SIMD dispatch (on by default, but cheap to assert),
+# and keep OpenCV's intra-op pool out of the way: the detection thread
+# pool already saturates the cores, and on corner-sized ROIs per-op
+# fan-out costs more in thread wake/sync than the work itself.
+cv2.setUseOptimized(True)
+cv2.setNumThreads(1)
+
+# orjson serializes straight to bytes in C, several times faster than
+# stdlib json; worth it when a server calls this per request, but not
+# worth a hard dependency for a CLI run.
+try:
+    import orjson
+
+    _HAVE_ORJSON = True
+except ImportError:
+    _HAVE_ORJSON = False
+
+# numba JITs the clustering/segment loops, which are pure-Python numeric
+# work (OpenCV does not help there). Optional, same as in
+# detect_watermark.py: interpreted fallbacks cover its absence.
+try:
+    from numba import njit
+
+    _HAVE_NUMBA = True
+except ImportError:
+    _HAVE_NUMBA = False
+
+SAMPLE_INTERVAL = 0.25
+
+# NVDEC decode via cv2.cudacodec when OpenCV was built with CUDA and a
+# device is present; software decode dominates wall time for 1080p+.
+try:
+    _HAVE_CUDA = (
+        hasattr(cv2, "cudacodec")
+        and cv2.cuda.getCudaEnabledDeviceCount() > 0
+    )
+except cv2.error:
+    _HAVE_CUDA = False
+SEARCH_MARGIN = 200
+MIN_BOX_SIZE = 20
+CLUSTER_THRESHOLD = 50
+SEGMENT_MAX_GAP = 1.0
+# Bound on decoded frames waiting for detection; keeps memory flat when
+# the decoder outruns the detectors.
+_QUEUE_DEPTH = 8
+
+# Corner-probe table in parallel (SoA) form: for corner k, its ROI
+# origin is x_off = XC[k][0]*width + XC[k][1]*margin_w and likewise for
+# y, so the offset is one indexed lookup with no per-corner branches.
+_CORNER_NAMES = ("top_left", "top_right", "bottom_left", "bottom_right")
+_CORNER_XC = ((0, 0), (1, -1), (0, 0), (1, -1))
+_CORNER_YC = ((0, 0), (0, 0), (1, -1), (1, -1))
+
+# Per-thread scratch buffers, keyed by (name, shape). Canny and
+# threshold allocate a fresh dst on every call unless handed one;
+# across hundreds of frames that is thousands of short-lived heap
+# allocations in the hot path. Thread-local so the buffers stay
+# correct if detection ever runs on a thread pool.
+_SCRATCH = threading.local()
+
+
+def _buf(name, shape, fill=None):
+    bufs = getattr(_SCRATCH, "bufs", None)
+    if bufs is None:
+        bufs = _SCRATCH.bufs = {}
+    buf = bufs.get((name, shape))
+    if buf is None:
+        buf = bufs[(name, shape)] = np.empty(shape, np.uint8)
+        if fill is not None:
+            buf.fill(fill)
+    return buf
+
+
+def _extract_frames_cuda(video_path, frame_interval, fps):
+    """Sample frames using the NVDEC hardware decoder.
+
+    cudacodec decodes on the GPU's dedicated silicon block and hands
+    back BGRA GpuMats; sampled frames are converted to BGR on-device and
+    only those are downloaded, so skipped frames never cross the PCIe
+    bus. The reader is sequential (no seeking), which NVDEC's throughput
+    easily absorbs.
+    """
+    reader = cv2.cudacodec.createVideoReader(video_path)
+    idx = 0
+    while True:
+        ok, gpu_frame = reader.nextFrame()
+        if not ok:
+            break
+        if idx % frame_interval == 0:
+            bgr = cv2.cuda.cvtColor(gpu_frame, cv2.COLOR_BGRA2BGR)
+            yield (idx / fps, bgr.download())
+        idx += 1
+
+
+# FOURCCs that are genuinely all-intra, where CAP_PROP_POS_FRAMES seeks
+# are frame-accurate and cheap. Inter-coded codecs (H.264/HEVC/MPEG-4)
+# re-decode from the preceding keyframe on every seek, so they use the
+# sequential grab() path instead (same split as detect_watermark.py).
+_SEEKABLE_FOURCCS = {"MJPG", "mjpg"}
+
+
+def _fourcc_str(cap):
+    code = int(cap.get(cv2.CAP_PROP_FOURCC))
+    return "".join(chr((code >> (8 * i)) & 0xFF) for i in range(4))
+
+
+def extract_frames(video_path, sample_interval=SAMPLE_INTERVAL, cap=None):
+    """Yield (timestamp, frame) samples every `sample_interval` seconds.
+
+    A generator rather than a list: a couple of minutes of 1080p samples
+    is gigabytes of pixels, and the caller only ever walks them once, so
+    each frame is released before the next is decoded and its pixels
+    stay cache-hot through detection.
+
+    `cap` may be an already-open VideoCapture on the same file -- the
+    constructor probes the whole container (moov atom and friends), so a
+    caller that just read the metadata should hand its capture over
+    rather than paying for a second probe. The generator assumes
+    ownership and releases it.
+
+    Decodes on NVDEC when available (see _extract_frames_cuda). On CPU,
+    all-intra codecs seek straight to each sampled index with
+    CAP_PROP_POS_FRAMES so intermediate frames are never decoded;
+    inter-coded streams (where every seek re-decodes from the
+    preceding keyframe, a net loss whenever the sample interval is
+    shorter than the GOP) take a sequential grab()/retrieve() loop
+    that skips the BGR conversion for unsampled frames instead.
+    """
+    if cap is None:
+        cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise RuntimeError(f"Could not open video: {video_path}")
+
+    try:
+        fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        frame_interval = max(1, int(round(fps * sample_interval)))
+
+        if _HAVE_CUDA:
+            produced = False
+            try:
+                for item in _extract_frames_cuda(
+                    video_path, frame_interval, fps
+                ):
+                    produced = True
+                    yield item
+            except cv2.error:
+                if produced:
+                    raise  # partial NVDEC stream; cannot restart cleanly
+                # codec unsupported by NVDEC; fall through to CPU
+            else:
+                if produced:
+                    return
+
+        if total_frames > 0 and _fourcc_str(cap) in _SEEKABLE_FOURCCS:
+            for idx in range(0, total_frames, frame_interval):
+                cap.set(cv2.CAP_PROP_POS_FRAMES, idx)
+                ret, frame = cap.read()
+                if not ret:
+                    break
+                yield (idx / fps, frame)
+        else:
+            frame_idx = 0
+            while cap.grab():
+                if frame_idx % frame_interval == 0:
+                    ret, frame = cap.retrieve()
+                    if not ret:
+                        break
+                    yield (frame_idx / fps, frame)
+                frame_idx += 1
+    finally:
+        cap.release()
+
+
+def _proximity_buckets(boxes, gap):
+    """Group (N, >=4) [x, y, w, h, ...] boxes whose gap-expanded rects
+    touch, via union-find over the broadcast pairwise overlap test.
+    Yields index arrays, one per bucket.
+    """
+    n = len(boxes)
+    x0 = boxes[:, 0] - gap
+    y0 = boxes[:, 1] - gap
+    x1 = boxes[:, 0] + boxes[:, 2] + gap
+    y1 = boxes[:, 1] + boxes[:, 3] + gap
+    overlap = (
+        (x0[:, None] < x1[None, :])
+        & (x1[:, None] > x0[None, :])
+        & (y0[:, None] < y1[None, :])
+        & (y1[:, None] > y0[None, :])
+    )
+
+    parent = list(range(n))
+
+    def find(i):
+        root = i
+        while parent[root] != root:
+            root = parent[root]
+        while parent[i] != root:
+            parent[i], i = root, parent[i]
+        return root
+
+    for i, j in zip(*np.nonzero(np.triu(overlap, 1))):
+        ri, rj = find(i), find(j)
+        if ri != rj:
+            parent[rj] = ri
+
+    groups = {}
+    for i in range(n):
+        groups.setdefault(find(i), []).append(i)
+    for idx in groups.values():
+        yield np.array(idx)
+
+
+def detect_watermark_region(
+    gray, height, width, search_margin=SEARCH_MARGIN, scale=1.0
+):
+    """Probe the four corner regions for a watermark-like edge cluster.
+
+    Takes the grayscale frame (the conversion is hoisted to the caller
+    and shared with detect_text_regions). `scale` is the factor the
+    frame was downscaled by; size and area gates are applied in
+    full-resolution units so thresholds mean the same thing at every
+    input size. Returns the best-scoring detection dict (coordinates in
+    the downscaled frame) or None if no corner shows a plausible mark.
+    """
+    margin_h = min(search_margin, height // 2)
+    margin_w = min(2 * search_margin, width // 2)
+    x_offs = [cw * width + cm * margin_w for cw, cm in _CORNER_XC]
+    y_offs = [ch * height + cm * margin_h for ch, cm in _CORNER_YC]
+
+    # Pack the four corner ROIs side by side with a zero gutter wider
+    # than the Canny aperture, then run ONE Canny + findContours
+    # over the packed image instead of four tiny calls -- the per-call
+    # overhead dwarfs the actual work on a corner-sized patch, and one
+    # larger image lets OpenCV's internal parallelism engage.
+    pad = 16
+    slot = margin_w + pad
+    # Gutters are zeroed on first use and only the slots are written
+    # afterwards, so they stay zero across reuses.
+    packed = _buf("packed", (margin_h, 4 * margin_w + 3 * pad), fill=0)
+    for k in range(4):
+        packed[:, k * slot : k * slot + margin_w] = gray[
+            y_offs[k] : y_offs[k] + margin_h,
+            x_offs[k] : x_offs[k] + margin_w,
+        ]
+
+    # The old 3x3 dilate existed only to thicken edges into blobs before
+    # contour extraction; a larger Canny aperture with the L2 gradient
+    # picks up the same weak watermark edges without the extra
+    # write/read round-trip over the edge buffer. Aperture 5 Sobel
+    # responses are ~16x the aperture-3 ones, so the hysteresis
+    # thresholds scale with them. Since raw edge chains enclose almost
+    # no area, the size gate uses the bounding-box area rather than
+    # contourArea.
+    edges = cv2.Canny(
+        packed,
+        800,
+        2400,
+        edges=_buf("edges", packed.shape),
+        apertureSize=5,
+        L2gradient=True,
+    )
+
+    # The content-to-gutter steps fire Canny along the full slot height;
+    # blank those columns (plus the Sobel half-width) so the vertical
+    # border stripes neither bridge corners nor smear the unions.
+    stripe = 3
+    for k in range(4):
+        edges[:, max(0, k * slot - stripe) : k * slot + stripe] = 0
+        right = k * slot + margin_w
+        edges[:, right - stripe : right + stripe] = 0
+
+    contours, _ = cv2.findContours(
+        edges, cv2.RETR_EXTERNAL, cv2.CHAIN_APPROX_SIMPLE
+    )
+
+    # Route each contour back to its corner by packed x-offset. Stats
+    # come out in downscaled pixels; gate on full-resolution areas
+    # (lengths scale with inv, areas with inv**2) the same way
+    # detect_watermark.py does, so the thresholds are
+    # resolution-independent.
+    inv = 1.0 / scale
+    per_corner = [[] for _ in _CORNER_NAMES]
+    for c in contours:
+        x, y, w, h = cv2.boundingRect(c)
+        area = w * h * inv * inv
+        if not 80 < area < 8000:
+            continue
+        k = min(3, x // slot)
+        per_corner[k].append((x - k * slot, y, w, h, area))
+
+    best = None
+    for k in range(4):
+        if not per_corner[k]:
+            continue
+        boxes = np.array(per_corner[k])
+        # Without the dilate pass nearby glyph edges no longer merge
+        # into one contour, so bucket boxes by proximity here and score
+        # each bucket separately -- taking the hull of everything in the
+        # corner would smear isolated background edges into the mark.
+        for idx in _proximity_buckets(boxes, gap=8):
+            group = boxes[idx]
+            min_x = int(group[:, 0].min())
+            min_y = int(group[:, 1].min())
+            max_x = int((group[:, 0] + group[:, 2]).max())
+            max_y = int((group[:, 1] + group[:, 3]).max())
+            score = float(group[:, 4].sum())
+
+            bw, bh = max_x - min_x, max_y - min_y
+            if bw * inv < 30 or bh * inv < 10:
+                continue
+            if bw >= margin_w or bh >= margin_h:
+                continue
+
+            det = {
+                "x": x_offs[k] + min_x,
+                "y": y_offs[k] + min_y,
+                "w": bw,
+                "h": bh,
+                "score": score,
+                "corner": _CORNER_NAMES[k],
+            }
+            if best is None or det["score"] > best["score"]:
+                best = det
+    return best
+
+
+def detect_text_regions(gray, search_margin=SEARCH_MARGIN, scale=1.0):
+    """Bright text candidates near the frame border.
+
+    Fallback for frames where the corner probe finds nothing, e.g. when
+    the mark sits slightly inside the corner margins. As in
+    detect_watermark_region, `scale` normalizes the size and area gates
+    to full-resolution units when the frame arrives downscaled.
+
+    The watermark is near-white, so a flat 200 threshold followed by
+    connectedComponentsWithStats finds it in one linear pass and hands
+    back the (N, 5) [x, y, w, h, area] stats the filters below want
+    directly. The MSER detector this replaces walked every intensity
+    level to arrive at the same bright blobs, an order of magnitude
+    more work per strip.
+
+    Only the four border strips are scanned -- anything further inside
+    was rejected by the margin test anyway, so scanning the interior
+    was pure waste (~5x the pixels at 1080p).
+    """
+    height, width = gray.shape
+    m = min(search_margin, height // 2, width // 2)
+    inv = 1.0 / scale
+
+    # Full-width top/bottom strips plus the left/right remainders; the
+    # offsets map strip-local boxes back to frame coordinates.
+    strips = (
+        (0, 0, gray[:m, :]),
+        (0, height - m, gray[height - m :, :]),
+        (0, m, gray[m : height - m, :m]),
+        (width - m, m, gray[m : height - m, width - m :]),
+    )
+
+    regions = []
+    for x_off, y_off, strip in strips:
+        if strip.size == 0:
+            continue
+        _, bright = cv2.threshold(
+            strip, 200, 255, cv2.THRESH_BINARY, dst=_buf("bright", strip.shape)
+        )
+        num, _, stats, _ = cv2.connectedComponentsWithStats(
+            bright, connectivity=8
+        )
+        if num <= 1:
+            continue
+        stats = stats[1:]  # row 0 is the background component
+        # Gate in full-resolution units; the aspect test is
+        # scale-invariant so it stays on the raw integer stats.
+        w = stats[:, cv2.CC_STAT_WIDTH] * inv
+        h = stats[:, cv2.CC_STAT_HEIGHT] * inv
+        area = stats[:, cv2.CC_STAT_AREA] * inv * inv
+        keep = (
+            (w >= 15)
+            & (h >= 8)
+            & (area >= 50)
+            & (area <= 5000)
+            & (w * 10 >= h * 12)  # w/h >= 1.2
+            & (w <= h * 12)
+        )
+        for x, y, bw, bh in stats[keep][:, :4]:
+            regions.append(
+                {
+                    "x": int(x) + x_off,
+                    "y": int(y) + y_off,
+                    "w": int(bw),
+                    "h": int(bh),
+                }
+            )
+    return regions
+
+
+def clamp_bboxes(detections, width, height, min_size=MIN_BOX_SIZE):
+    """Clamp detections to the frame; drop any that become too small.
+
+    All boxes are stacked into one (N, 4) int32 array so the clamp is
+    two clips and two minimums over contiguous columns plus a boolean
+    mask, instead of N rounds of Python max/min and dict churn.
+    """
+    if not detections:
+        return []
+    arr = np.array(
+        [[d["x"], d["y"], d["w"], d["h"]] for d in detections], np.int32
+    )
+    ts = [d["timestamp"] for d in detections]
+
+    np.clip(arr[:, 0], 0, None, out=arr[:, 0])
+    np.clip(arr[:, 1], 0, None, out=arr[:, 1])
+    arr[:, 2] = np.minimum(arr[:, 2], width - arr[:, 0])
+    arr[:, 3] = np.minimum(arr[:, 3], height - arr[:, 1])
+    keep = (arr[:, 2] >= min_size) & (arr[:, 3] >= min_size)
+
+    return [
+        {"x": x, "y": y, "w": w, "h": h, "timestamp": ts[i]}
+        for i, (x, y, w, h) in zip(
+            np.nonzero(keep)[0].tolist(), arr[keep].tolist()
+        )
+    ]
+
+
+def _cluster_labels_py(cx, cy, threshold):
+    """Interpreted fallback for _cluster_kernel (same grid + union-find)."""
+    n = len(cx)
+    cells = {}
+    for i, cell in enumerate(
+        zip((cx // threshold).astype(int), (cy // threshold).astype(int))
+    ):
+        cells.setdefault(cell, []).append(i)
+
+    parent = list(range(n))
+
+    def find(i):
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    # Each unordered cell pair is visited once via a half neighborhood.
+    for (gx, gy), members in cells.items():
+        for dgx, dgy in ((0, 0), (1, 0), (0, 1), (1, 1), (1, -1)):
+            others = cells.get((gx + dgx, gy + dgy))
+            if others is None:
+                continue
+            for i in members:
+                for j in others:
+                    if (dgx, dgy) == (0, 0) and j <= i:
+                        continue
+                    if (
+                        abs(cx[i] - cx[j]) < threshold
+                        and abs(cy[i] - cy[j]) < threshold
+                    ):
+                        parent[find(i)] = find(j)
+
+    return np.array([find(i) for i in range(n)], np.int64)
+
+
+if _HAVE_NUMBA:
+
+    @njit(cache=True)
+    def _cluster_kernel(cx, cy, threshold):
+        """Grid-bucketed union-find over detection centers.
+
+        Same algorithm as _cluster_labels_py, but the dict-of-lists grid
+        becomes a sorted cell-key array walked with searchsorted, which
+        numba compiles to tight machine code. Returns a root label per
+        detection.
+        """
+        n = cx.size
+        gx = np.empty(n, np.int64)
+        gy = np.empty(n, np.int64)
+        for i in range(n):
+            gx[i] = np.int64(cx[i] // threshold)
+            gy[i] = np.int64(cy[i] // threshold)
+        # Centers are non-negative and frames are far smaller than 2**20
+        # cells on a side, so this packing cannot collide.
+        key = gx * 1048576 + gy
+        order = np.argsort(key)
+        skey = key[order]
+
+        parent = np.arange(n)
+        doff = np.array(
+            [[0, 0], [1, 0], [0, 1], [1, 1], [1, -1]], np.int64
+        )
+        for i in range(n):
+            for k in range(doff.shape[0]):
+                nkey = (gx[i] + doff[k, 0]) * 1048576 + (gy[i] + doff[k, 1])
+                p = np.searchsorted(skey, nkey)
+                while p < n and skey[p] == nkey:
+                    j = order[p]
+                    p += 1
+                    if k == 0 and j <= i:
+                        continue
+                    if (
+                        abs(cx[i] - cx[j]) < threshold
+                        and abs(cy[i] - cy[j]) < threshold
+                    ):
+                        ri = i
+                        while parent[ri] != ri:
+                            ri = parent[ri]
+                        rj = j
+                        while parent[rj] != rj:
+                            rj = parent[rj]
+                        if ri != rj:
+                            parent[rj] = ri
+
+        labels = np.empty(n, np.int64)
+        for i in range(n):
+            r = i
+            while parent[r] != r:
+                r = parent[r]
+            labels[i] = r
+        return labels
+
+    @njit(cache=True)
+    def _segments_kernel(ts, max_gap):
+        """Merge sorted timestamps into (start, end) spans."""
+        n = ts.size
+        out = np.empty((n, 2), ts.dtype)
+        m = 0
+        for i in range(n):
+            if m > 0 and ts[i] - out[m - 1, 1] <= max_gap:
+                out[m - 1, 1] = ts[i]
+            else:
+                out[m, 0] = ts[i]
+                out[m, 1] = ts[i]
+                m += 1
+        return out[:m]
+
+
+def cluster_detections(detections, threshold=CLUSTER_THRESHOLD):
+    """Group detections whose centers sit within `threshold` pixels.
+
+    Detections are bucketed into a grid of `threshold`-sized cells, so
+    only pairs in the same or adjacent cells are compared -- near-linear
+    instead of the old all-pairs loop. Union-find keeps the same
+    transitive grouping the old chained merge produced, without its
+    insertion-order dependence. The numeric work runs in a numba kernel
+    when available; dicts exist only at this API boundary.
+
+    Returns one dict per cluster with the union bounding box, the member
+    count and the sorted timestamps the cluster was seen at.
+    """
+    if not detections:
+        return []
+
+    boxes = np.array(
+        [[d["x"], d["y"], d["w"], d["h"]] for d in detections], np.int32
+    )
+    cx = boxes[:, 0] + boxes[:, 2] / 2
+    cy = boxes[:, 1] + boxes[:, 3] / 2
+
+    if _HAVE_NUMBA:
+        labels = _cluster_kernel(cx, cy, float(threshold))
+    else:
+        labels = _cluster_labels_py(cx, cy, threshold)
+
+    groups = {}
+    for i, label in enumerate(labels):
+        groups.setdefault(int(label), []).append(i)
+
+    merged = []
+    for members in groups.values():
+        sub = boxes[members]
+        min_x = int(sub[:, 0].min())
+        min_y = int(sub[:, 1].min())
+        max_x = int((sub[:, 0] + sub[:, 2]).max())
+        max_y = int((sub[:, 1] + sub[:, 3]).max())
+        merged.append(
+            {
+                "x": min_x,
+                "y": min_y,
+                "w": max_x - min_x,
+                "h": max_y - min_y,
+                "count": len(members),
+                "timestamps": sorted(
+                    detections[i]["timestamp"] for i in members
+                ),
+            }
+        )
+    return merged
+
+
+def create_segments(timestamps, max_gap=SEGMENT_MAX_GAP):
+    """Merge sorted timestamps into [start, end] visibility segments."""
+    ts = np.asarray(timestamps, np.float64)
+    if _HAVE_NUMBA and ts.size:
+        spans = _segments_kernel(ts, float(max_gap))
+        return [{"start": s, "end": e} for s, e in spans.tolist()]
+
+    segments = []
+    for t in timestamps:
+        if segments and t - segments[-1]["end"] <= max_gap:
+            segments[-1]["end"] = t
+        else:
+            segments.append({"start": t, "end": t})
+    return segments
+
+
+def _downscale(gray, scale):
+    """Resize with INTER_AREA (the proper filter for shrinking)."""
+    if scale == 1.0:
+        return gray
+    return cv2.resize(
+        gray, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA
+    )
+
+
+def _dhash(roi):
+    """64-bit difference hash: resize to 9x8, compare adjacent columns."""
+    r = cv2.resize(roi, (9, 8), interpolation=cv2.INTER_AREA)
+    bits = np.packbits((r[:, 1:] > r[:, :-1]).ravel())
+    return int.from_bytes(bits.tobytes(), "big")
+
+
+# Last (corner hashes, detections) per worker thread/process. The mark
+# is static within a shot, so when no corner changed perceptibly the
+# previous frame's detections are reused with the new timestamp.
+_LAST = threading.local()
+
+
+def _detect_one(item):
+    """Run both detectors on one (timestamp, gray, scale) sample.
+
+    The frame arrives already grayscale and downscaled by `scale`;
+    detections are mapped back to full-resolution coordinates before
+    returning, so everything downstream stays scale-agnostic.
+
+    Before running detection, the four corner ROIs are dHashed and
+    compared against the previous sample handled by this worker; if
+    every corner is within 4 bits of the last frame, detection is
+    skipped and the prior result reused. Workers drain the frame queue
+    in order, so each one sees a roughly consecutive subsequence and
+    static shots short-circuit most samples.
+    """
+    timestamp, gray, scale = item
+    height, width = gray.shape
+    margin = max(1, int(SEARCH_MARGIN * scale))
+
+    margin_h = min(margin, height // 2)
+    margin_w = min(2 * margin, width // 2)
+    hashes = (
+        _dhash(gray[:margin_h, :margin_w]),
+        _dhash(gray[:margin_h, width - margin_w :]),
+        _dhash(gray[height - margin_h :, :margin_w]),
+        _dhash(gray[height - margin_h :, width - margin_w :]),
+    )
+    last = getattr(_LAST, "state", None)
+    if last is not None and all(
+        (h ^ o).bit_count() < 4 for h, o in zip(hashes, last[0])
+    ):
+        return [dict(det, timestamp=timestamp) for det in last[1]]
+
+    det = detect_watermark_region(gray, height, width, margin, scale)
+    if det is not None:
+        detections = [det]
+    else:
+        detections = detect_text_regions(gray, margin, scale)
+    inv = 1.0 / scale
+    for det in detections:
+        if scale != 1.0:
+            det["x"] = int(round(det["x"] * inv))
+            det["y"] = int(round(det["y"] * inv))
+            det["w"] = int(round(det["w"] * inv))
+            det["h"] = int(round(det["h"] * inv))
+    _LAST.state = (hashes, [dict(det) for det in detections])
+    for det in detections:
+        det["timestamp"] = timestamp
+    return detections
+
+
+def analyze_video(video_path):
+    """Full analysis: sample, detect per frame, cluster, build segments."""
+    # One container probe: the capture opened for metadata is handed to
+    # extract_frames instead of letting it open (and re-parse) the file
+    # a second time.
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        return {"error": f"Could not open video: {video_path}"}
+    fps = cap.get(cv2.CAP_PROP_FPS) or 30.0
+    width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+    height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+    total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    duration = total_frames / fps if fps else 0.0
+
+    # The mark is 100+ px tall at 1080p, so detection survives halving
+    # the resolution while every downstream op (Canny, findContours,
+    # thresholding) does a quarter of the pixel work -- they are all
+    # memory-bandwidth-bound at full HD. Bboxes are scaled back inside
+    # _detect_one.
+    scale = 0.5 if max(width, height) > 1280 else 1.0
+
+    # Producer/consumer split: one thread decodes and grayscales frames
+    # into a bounded queue while detection threads drain it, so decode
+    # overlaps detection and at most QUEUE_DEPTH frames are in flight.
+    # Threads suffice -- OpenCV releases the GIL inside decode, resize,
+    # Canny and connectedComponents -- and they avoid the pickle cost
+    # of shipping every frame to a process pool.
+    workers = max(1, (os.cpu_count() or 2) - 1)
+    frame_queue = queue.Queue(maxsize=_QUEUE_DEPTH)
+
+    def _produce():
+        try:
+            for t, frame in extract_frames(video_path, cap=cap):
+                gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+                frame_queue.put((t, _downscale(gray, scale), scale))
+        finally:
+            for _ in range(workers):
+                frame_queue.put(None)  # one sentinel per consumer
+
+    def _drain():
+        found = []
+        while (item := frame_queue.get()) is not None:
+            found.extend(_detect_one(item))
+        return found
+
+    producer = threading.Thread(target=_produce, daemon=True)
+    producer.start()
+    with ThreadPoolExecutor(max_workers=workers) as ex:
+        futures = [ex.submit(_drain) for _ in range(workers)]
+        raw = [det for future in futures for det in future.result()]
+    producer.join()
+
+    detections = clamp_bboxes(raw, width, height)
+
+    watermarks = []
+    for cluster in cluster_detections(detections):
+        timestamps = cluster.pop("timestamps")
+        cluster["segments"] = create_segments(timestamps)
+        watermarks.append(cluster)
+
+    return {
+        "video": video_path,
+        "fps": fps,
+        "width": width,
+        "height": height,
+        "duration": duration,
+        "watermarks": watermarks,
+    }
+
+
+def _print_json(result, pretty=False):
+    """Write `result` to stdout as JSON.
+
+    Compact by default: indent mode writes roughly 3x the bytes and only
+    helps a human reader, so it sits behind --pretty.
+    """
+    if _HAVE_ORJSON:
+        option = orjson.OPT_INDENT_2 if pretty else 0
+        sys.stdout.buffer.write(orjson.dumps(result, option=option))
+        sys.stdout.buffer.write(b"\n")
+        sys.stdout.buffer.flush()
+    else:
+        print(json.dumps(result, indent=2 if pretty else None), flush=True)
+
+
+def _serve():
+    """Analyze video paths read from stdin, one report line per path.
+
+    Keeps the interpreter hot across videos: importing numpy + cv2
+    costs several hundred milliseconds per process, which dominates
+    short clips when the caller spawns this script per video. A parent
+    (e.g. the Node server) starts one worker and pipes paths in;
+    output stays compact so each report is exactly one line.
+    """
+    for line in sys.stdin:
+        path = line.strip()
+        if not path:
+            continue
+        try:
+            result = analyze_video(path)
+        except Exception as exc:  # keep the loop alive for the next path
+            result = {"video": path, "error": str(exc)}
+        _print_json(result)
+
+
+def main():
+    args = sys.argv[1:]
+    pretty = "--pretty" in args
+    if pretty:
+        args.remove("--pretty")
+    if "--server" in args:
+        _serve()
+        return
+    if not args:
+        _print_json(
+            {"error": "usage: analyze_video.py [--pretty|--server] <video_path>"}
+        )
+        sys.exit(1)
+    result = analyze_video(args[0])
+    _print_json(result, pretty)
+
+
+if __name__ == "__main__":
+    main()